@@ -38,6 +38,35 @@ class OrchestratorAgent:
             }
         }
     
+    def query_model(self, model, prompt, timeout=60):
+        """Envoie un prompt à un modèle et retourne la réponse complète (None en cas d'erreur)"""
+        payload = {
+            "model": model,
+            "prompt": prompt
+        }
+        
+        try:
+            response = requests.post(self.api_url, json=payload, timeout=timeout, stream=True)
+            response.raise_for_status()
+            
+            full_response = ""
+            for line in response.iter_lines():
+                if line:
+                    try:
+                        data = json.loads(line)
+                        if data.get("response"):
+                            full_response += data["response"]
+                        if data.get("done"):
+                            break
+                    except json.JSONDecodeError:
+                        continue
+            
+            return full_response
+            
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Erreur lors de l'appel à {model}: {e}")
+            return None
+    
     def classify_section(self, section_text):
         """Classifie une section du plan pour choisir l'agent approprié"""
         section_lower = section_text.lower()
@@ -93,32 +122,12 @@ PLAN GLOBAL : [brève description du plan]
 
 [etc...]"""
         
-        payload = {
-            "model": self.orchestrator_model,
-            "prompt": prompt
-        }
+        full_response = self.query_model(self.orchestrator_model, prompt, timeout=30)
+        if full_response is None:
+            return "Erreur de connexion à l'API"
         
-        try:
-            response = requests.post(self.api_url, json=payload, timeout=30, stream=True)
-            response.raise_for_status()
-            
-            full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        data = json.loads(line)
-                        if data.get("response"):
-                            full_response += data["response"]
-                        if data.get("done"):
-                            break
-                    except json.JSONDecodeError:
-                        continue
-            
-            # print(f"DEBUG: Réponse brute de l'API: {full_response[:500]}...")
-            return self.parse_and_assign_agents(full_response) if full_response else "Erreur: pas de réponse générée"
-            
-        except requests.exceptions.RequestException as e:
-            return f"Erreur de connexion à l'API: {e}"
+        # print(f"DEBUG: Réponse brute de l'API: {full_response[:500]}...")
+        return self.parse_and_assign_agents(full_response) if full_response else "Erreur: pas de réponse générée"
     
     def parse_and_assign_agents(self, plan_text):
         """Parse le plan et assigne les agents appropriés"""
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import threading
+import unicodedata
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'models'))
+from models import get_model_tiers
+
+# En dessous de ce taux de réussite (sur assez d'essais récents), un palier est sauté
+MIN_SUCCESS_RATE = 0.5
+MIN_ATTEMPTS = 3
+
+# Seuls les derniers essais comptent : un modèle peut se rattraper
+RECENT_WINDOW = 10
+
+# Un palier sauté est réessayé après ce nombre de sauts pour rafraîchir ses stats
+RETRY_AFTER_SKIPS = 5
+
+# Plusieurs agents peuvent tourner en parallèle (serveur) sur le même fichier
+STATS_LOCK = threading.Lock()
+
+
+class ModelTierPolicy:
+    def __init__(self, stats_path=None):
+        self.stats_path = stats_path or os.path.join(os.path.dirname(__file__), 'model_stats.json')
+        self.stats = self.load_stats()
+
+    def load_stats(self):
+        """Charge l'historique des statistiques (catégorie, modèle)"""
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_stats(self):
+        """Sauvegarde l'historique des statistiques"""
+        try:
+            with open(self.stats_path, 'w', encoding='utf-8') as f:
+                json.dump(self.stats, f, indent=2)
+        except OSError as e:
+            print(f"⚠️  Impossible de sauvegarder les statistiques des modèles: {e}")
+
+    def key(self, category, model):
+        return f"{category}|{model}"
+
+    def get_stats(self, category, model):
+        """Retourne les statistiques d'un couple (catégorie, modèle)"""
+        stats = self.stats.get(self.key(category, model), {'attempts': 0, 'successes': 0, 'total_latency': 0.0})
+        stats.setdefault('recent', [])
+        stats.setdefault('skipped', 0)
+        return stats
+
+    def success_rate(self, category, model):
+        """Taux de réussite sur les derniers essais (None si pas assez d'essais)"""
+        recent = self.get_stats(category, model)['recent']
+        if len(recent) < MIN_ATTEMPTS:
+            return None
+        return sum(recent) / len(recent)
+
+    def record(self, category, model, success, latency):
+        """Enregistre le résultat et la latence d'un essai"""
+        with STATS_LOCK:
+            # Relire le fichier pour ne pas écraser les essais des autres agents
+            self.stats = self.load_stats()
+            stats = self.get_stats(category, model)
+            stats['attempts'] += 1
+            stats['successes'] += 1 if success else 0
+            stats['total_latency'] += latency
+            stats['recent'] = (stats['recent'] + [1 if success else 0])[-RECENT_WINDOW:]
+            self.stats[self.key(category, model)] = stats
+            self.save_stats()
+
+    def should_skip(self, category, model):
+        """Saute un palier peu fiable, sauf de temps en temps pour lui laisser une chance"""
+        with STATS_LOCK:
+            self.stats = self.load_stats()
+            rate = self.success_rate(category, model)
+            if rate is None or rate >= MIN_SUCCESS_RATE:
+                return False
+
+            stats = self.get_stats(category, model)
+            stats['skipped'] += 1
+            retry = stats['skipped'] > RETRY_AFTER_SKIPS
+            if retry:
+                stats['skipped'] = 0
+            self.stats[self.key(category, model)] = stats
+            self.save_stats()
+            return not retry
+
+    def start_tier(self, tiers, complexity):
+        """Palier de départ selon la complexité annoncée dans le plan"""
+        level = unicodedata.normalize('NFKD', complexity or '').encode('ascii', 'ignore').decode().lower()
+        if 'elev' in level or 'haut' in level:
+            return len(tiers) - 1
+        if 'moyen' in level:
+            return (len(tiers) - 1) // 2
+        return 0
+
+    def candidates(self, category, complexity, default_model):
+        """Modèles à essayer dans l'ordre : le plus léger adéquat d'abord, puis escalade"""
+        tiers = get_model_tiers(category) or [default_model]
+        start = self.start_tier(tiers, complexity)
+
+        # Sauter les paliers qui échouent trop souvent pour cette catégorie
+        while start < len(tiers) - 1 and self.should_skip(category, tiers[start]):
+            start += 1
+
+        return tiers[start:]
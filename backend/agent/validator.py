@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import os
+import re
+
+# Vérifications syntaxiques rapides par extension (aucun appel au modèle)
+SYNTAX_CHECKS = {
+    '.py': 'python3 -m py_compile {path}',
+    '.c': 'gcc -fsyntax-only {path}',
+    '.cpp': 'g++ -fsyntax-only {path}',
+    '.sh': 'bash -n {path}',
+    '.js': 'node --check {path}',
+    '.json': 'python3 -m json.tool {path} > /dev/null',
+}
+
+
+class StepValidator:
+    def __init__(self, orchestrator, terminal):
+        self.orchestrator = orchestrator
+        self.terminal = terminal
+        self.judge_model = "mistral:latest"
+        self.fallback_judge_model = orchestrator.orchestrator_model
+
+    def check_commands(self, executions):
+        """Vérifie les codes de retour des commandes exécutées pendant l'étape"""
+        failed = [e['command'] for e in executions if not e['result']['success']]
+        if failed:
+            return False, f"Commandes en échec : {', '.join(failed[:3])}"
+        return True, None
+
+    def check_files(self, written_files):
+        """Vérifie que les fichiers écrits par l'étape existent toujours (pas supprimés par une commande)"""
+        missing = [f for f in written_files
+                   if not os.path.exists(os.path.join(self.terminal.workspace, f))]
+        if missing:
+            return False, f"Fichiers manquants : {', '.join(missing)}"
+        return True, None
+
+    def check_syntax(self, written_files):
+        """Compile ou vérifie la syntaxe des fichiers écrits quand un outil le permet"""
+        for filename in written_files:
+            check = SYNTAX_CHECKS.get(os.path.splitext(filename)[1])
+            if not check:
+                continue
+            result = self.terminal.execute_command(check.format(path=filename), timeout=30)
+            # Outil absent du container : vérification non concluante, on l'ignore
+            if result['return_code'] == 127:
+                continue
+            if not result['success']:
+                return False, f"Vérification de {filename} en échec : {result['stderr'][:200]}"
+        return True, None
+
+    def judge(self, model, description, response):
+        """Demande à un modèle si l'étape a atteint son objectif (None si pas de verdict)"""
+        prompt = f"""Tu es un vérificateur. Indique si la réponse suivante accomplit l'étape demandée.
+
+Étape : {description}
+
+Réponse de l'agent :
+{response[:3000]}
+
+Réponds sur la première ligne par OUI ou NON, puis donne une justification courte."""
+
+        verdict = self.orchestrator.query_model(model, prompt, timeout=30)
+        if not verdict:
+            return None, "Pas de verdict du vérificateur"
+
+        first_line = verdict.strip().split('\n')[0].upper()
+        feedback = verdict.strip()[:300]
+        # Seul le premier mot compte : "OUI, le fichier annoncé..." contient aussi "NON"
+        match = re.match(r'\W*(OUI|NON)\b', first_line)
+        if not match:
+            return None, feedback
+        return match.group(1) == 'OUI', feedback
+
+    def validate(self, description, outcome):
+        """Valide une étape : vérifications déterministes d'abord, puis modèle léger, puis gros modèle"""
+        if not outcome or not outcome.get('response'):
+            return {'success': False, 'feedback': "Aucune réponse de l'agent"}
+
+        if outcome.get('write_error'):
+            return {'success': False, 'feedback': f"Écriture des fichiers en échec : {outcome['write_error']}"}
+
+        written_files = outcome.get('files', [])
+        checks = (
+            lambda: self.check_commands(outcome.get('executions', [])),
+            lambda: self.check_files(written_files),
+            lambda: self.check_syntax(written_files),
+        )
+        for check in checks:
+            success, feedback = check()
+            if not success:
+                return {'success': False, 'feedback': feedback}
+
+        light_success, light_feedback = self.judge(self.judge_model, description, outcome['response'])
+        if light_success:
+            return {'success': True, 'feedback': light_feedback}
+
+        # Le modèle léger doute : on ne sollicite le gros modèle qu'à ce moment-là
+        print(f"🔁 Vérification escaladée vers {self.fallback_judge_model}")
+        success, feedback = self.judge(self.fallback_judge_model, description, outcome['response'])
+        if success is not None:
+            return {'success': success, 'feedback': feedback}
+        if light_success is False:
+            # Le refus explicite du modèle léger n'est pas contredit
+            return {'success': False, 'feedback': light_feedback}
+        # Aucun verdict exploitable : les vérifications déterministes font foi
+        return {'success': True, 'feedback': "Vérifications déterministes réussies"}
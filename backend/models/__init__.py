@@ -1,3 +1,3 @@
-from .models import MODELS, RECOMMENDED_MODELS, get_all_models, get_model_info, get_recommended_model, get_models_by_category
+from .models import MODELS, RECOMMENDED_MODELS, get_all_models, get_model_info, get_recommended_model, get_models_by_category, MODEL_TIERS, get_model_tiers
 
-__all__ = ['MODELS', 'RECOMMENDED_MODELS', 'get_all_models', 'get_model_info', 'get_recommended_model', 'get_models_by_category']
\ No newline at end of file
+__all__ = ['MODELS', 'RECOMMENDED_MODELS', 'get_all_models', 'get_model_info', 'get_recommended_model', 'get_models_by_category', 'MODEL_TIERS', 'get_model_tiers']
\ No newline at end of file
@@ -68,6 +68,14 @@ RECOMMENDED_MODELS = {
     "lightweight": "mistral:latest"
 }
 
+# Paliers de modèles par catégorie, du plus léger au plus lourd
+MODEL_TIERS = {
+    "general": ["mistral:latest", "mistral-small3.2:latest", "gpt-oss:20b"],
+    "code": ["devstral-small-2:24b", "qwen3-coder:30b"],
+    "vision": ["qwen3-vl:32b"],
+    "lightweight": ["mistral:latest", "mistral-small3.2:latest"]
+}
+
 def get_all_models():
     """Retourne tous les modèles disponibles"""
     return MODELS
@@ -82,4 +90,8 @@ def get_models_by_category(category):
 
 def get_recommended_model(category):
     """Retourne le modèle recommandé pour une catégorie"""
-    return RECOMMENDED_MODELS.get(category)
\ No newline at end of file
+    return RECOMMENDED_MODELS.get(category)
+
+def get_model_tiers(category):
+    """Retourne les paliers de modèles d'une catégorie, du plus léger au plus lourd"""
+    return MODEL_TIERS.get(category, [])
\ No newline at end of file
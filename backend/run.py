@@ -6,15 +6,36 @@ import os
 sys.path.append(os.path.dirname(__file__))
 
 from agent.orchestrator import OrchestratorAgent
+from agent.validator import StepValidator
+from agent.tiering import ModelTierPolicy
 from tools.terminal import TerminalTool
+from tools.command_filter import CommandFilter
+from tools.artifacts import ArtifactExtractor
 import re
-import json
-import requests
+import time
+
+# Taille maximale de la sortie d'une commande transmise dans un événement
+MAX_EVENT_OUTPUT = 8000
 
 class ContainerAgent:
-    def __init__(self):
+    def __init__(self, event_callback=None, workspace=None):
         self.orchestrator = OrchestratorAgent()
-        self.terminal = TerminalTool()
+        self.terminal = TerminalTool(workspace) if workspace else TerminalTool()
+        self.command_filter = CommandFilter()
+        self.artifact_extractor = ArtifactExtractor()
+        self.validator = StepValidator(self.orchestrator, self.terminal)
+        self.tier_policy = ModelTierPolicy()
+        self.event_callback = event_callback
+        self.stop_requested = False
+    
+    def request_stop(self):
+        """Demande l'arrêt du plan avant l'étape suivante"""
+        self.stop_requested = True
+    
+    def emit(self, event_type, **data):
+        """Transmet un événement (step_started, step_failed...) au client s'il y en a un"""
+        if self.event_callback:
+            self.event_callback({'type': event_type, **data})
         
     def extract_and_execute_commands(self, plan_text):
         """Extrait les commandes du plan et les exécute"""
@@ -44,14 +65,12 @@ class ContainerAgent:
                         # Tentative de parser manuellement
                         commands = [cmd.strip() for cmd in commands_text.split(',') if cmd.strip()]
                     
-                    for cmd in commands:
+                    # Dédoublonner et écarter ce qui n'est pas du shell
+                    for clean_cmd in self.command_filter.filter(commands):
+                        if self.stop_requested:
+                            break
                         print(f"\n📋 {current_step}")
-                        print(f"⚡ Exécution: {cmd}")
-                        
-                        # Nettoyer et préparer la commande
-                        clean_cmd = cmd.strip()
-                        if clean_cmd.startswith(('#', '//')):
-                            continue  # Skip comments
+                        print(f"⚡ Exécution: {clean_cmd}")
                         
                         # Exécuter la commande
                         result = self.terminal.execute_command(clean_cmd, timeout=30)
@@ -70,11 +89,12 @@ class ContainerAgent:
         
         return execution_log
     
-    def execute_agent_task(self, agent_type, task_description):
-        """Exécute une tâche spécifique avec un agent spécialisé"""
+    def execute_agent_task(self, agent_type, task_description, model=None):
+        """Exécute une tâche spécifique avec un agent spécialisé (modèle imposé optionnel)"""
         agent = self.orchestrator.agents[agent_type]
+        model = model or agent['model']
         
-        print(f"\n🤖 Appel à {agent['name']} ({agent['model']})")
+        print(f"\n🤖 Appel à {agent['name']} ({model})")
         print(f"📝 Tâche: {task_description}")
         
         # Construction du prompt pour l'agent spécialisé
@@ -95,110 +115,125 @@ CODE :
 COMMANDES :
 [liste des commandes]"""
         
-        payload = {
-            "model": agent['model'],
-            "prompt": prompt
-        }
-        
-        try:
-            response = requests.post(self.orchestrator.api_url, json=payload, timeout=60, stream=True)
-            response.raise_for_status()
-            
-            full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        data = json.loads(line)
-                        if data.get("response"):
-                            full_response += data["response"]
-                        if data.get("done"):
-                            break
-                    except json.JSONDecodeError:
-                        continue
-            
-            return self.parse_and_execute_agent_response(full_response)
-            
-        except Exception as e:
-            print(f"❌ Erreur lors de l'appel à {agent['name']}: {e}")
-            return None
+        full_response = self.orchestrator.query_model(model, prompt, timeout=60)
+        if full_response is None:
+            return None  # API injoignable ou timeout : rien à reprocher au modèle
+        return self.parse_and_execute_agent_response(full_response)
     
     def parse_and_execute_agent_response(self, response):
-        """Parse la réponse de l'agent et exécute les commandes"""
-        if not response:
+        """Parse la réponse de l'agent, exécute les commandes et retourne le bilan de l'étape"""
+        if response is None:
             return None
         
-        print(f"🔍 Réponse brute de l'agent:\n{response[:500]}...")
+        outcome = {'response': response, 'files': [], 'executions': []}
         
-        # Extraire le contenu markdown/fichier
-        content_patterns = [
-            r'```markdown\n(.*?)\n```',
-            r'```\n(.*?)\n```',
-            r'CODE\s*:\s*(.*?)(?=COMMANDES|$)',
-        ]
+        print(f"🔍 Réponse brute de l'agent:\n{response[:500]}...")
         
-        content = ""
-        for pattern in content_patterns:
-            match = re.search(pattern, response, re.DOTALL | re.IGNORECASE)
-            if match:
-                content = match.group(1).strip()
-                print(f"📝 Contenu généré:\n{content[:300]}{'...' if len(content) > 300 else ''}")
-                break
+        # Extraire tous les blocs de code avec leur chemin ou langage
+        artifacts, commands = self.artifact_extractor.extract(response)
+        text = self.artifact_extractor.strip_fences(response)
         
-        # Détecter le type de fichier et le nom
-        filename = "generated_content.txt"
-        if "react" in response.lower() or "résumé" in response.lower():
-            filename = "react-summary.md"
-        elif ".py" in response:
-            filename = "script.py"
-        elif ".c" in response:
-            filename = "program.c"
+        # Sans bloc de code : contenu brut de la section CODE
+        if not artifacts:
+            code_match = re.search(r'CODE\s*:\s*(.*?)(?=COMMANDES|$)', text, re.DOTALL | re.IGNORECASE)
+            if code_match and code_match.group(1).strip():
+                artifacts.append({'path': 'generated_content.txt', 'language': '', 'content': code_match.group(1).strip()})
         
-        # Écrire le contenu
-        if content:
-            write_result = self.terminal.write_file(filename, content)
+        # Écrire tous les fichiers en une seule transaction
+        if artifacts:
+            for artifact in artifacts:
+                content = artifact['content']
+                print(f"📝 {artifact['path']}:\n{content[:300]}{'...' if len(content) > 300 else ''}")
+            
+            write_result = self.terminal.write_files([(a['path'], a['content']) for a in artifacts])
             if write_result['success']:
-                print(f"💾 Fichier créé: {write_result['message']}")
-        
-        # Extraire les commandes de plusieurs manières
-        commands = []
+                print(f"💾 Fichiers créés: {', '.join(write_result['files'])}")
+                outcome['files'].extend(write_result['files'])
+                self.emit('files_updated', files=write_result['files'])
+            else:
+                print(f"❌ Écriture des fichiers: {write_result['message']}")
+                outcome['write_error'] = write_result['message']
         
         # Pattern 1: Section COMMANDES
-        commands_match = re.search(r'COMMANDES\s*:?\s*\n(.*?)(?=\n\n|\Z)', response, re.DOTALL | re.IGNORECASE)
+        commands_match = re.search(r'COMMANDES\s*:?\s*\n(.*?)(?=\n\n|\Z)', text, re.DOTALL | re.IGNORECASE)
         if commands_match:
             commands_text = commands_match.group(1)
             commands.extend([cmd.strip() for cmd in commands_text.split('\n') if cmd.strip()])
         
-        # Pattern 2: Commandes dans des backticks
-        backtick_commands = re.findall(r'`([^`]+)`', response)
+        # Pattern 2: Commandes dans des backticks (hors blocs de code)
+        backtick_commands = re.findall(r'`([^`]+)`', text)
         commands.extend(backtick_commands)
         
         # Pattern 3: Commandes évidentes pour PDF
         if "pdf" in response.lower() and "pandoc" in response.lower():
-            if filename.endswith('.md'):
-                commands.append(f"pandoc {filename} -o {filename.replace('.md', '.pdf')}")
+            for filename in outcome['files']:
+                if filename.endswith('.md'):
+                    commands.append(f"pandoc {filename} -o {filename.replace('.md', '.pdf')}")
         
-        # Nettoyer et exécuter les commandes
-        for cmd in commands:
-            cmd = cmd.strip()
+        # Nettoyer, dédoublonner et filtrer avant exécution
+        for cmd in self.command_filter.filter(commands):
+            if self.stop_requested:
+                print("⏹️  Arrêt demandé : commandes restantes ignorées")
+                break
+            print(f"⚡ Exécution: {cmd}")
+            self.emit('tool_call', tool='terminal', arguments={'command': cmd})
+            result = self.terminal.execute_command(cmd, timeout=60)
+            output = result['stdout'] if result['success'] else result['stderr'] or result['stdout']
+            self.emit('tool_result', tool='terminal', success=result['success'], output=output[-MAX_EVENT_OUTPUT:])
+            print(f"🔄 {'✅ Succès' if result['success'] else '❌ Erreur'}")
+            if result['stdout']:
+                print(f"📤 {result['stdout'][:200]}{'...' if len(result['stdout']) > 200 else ''}")
+            if result['stderr']:
+                print(f"⚠️  {result['stderr'][:200]}{'...' if len(result['stderr']) > 200 else ''}")
+            outcome['executions'].append({'command': cmd, 'result': result})
+        
+        return outcome
+    
+    def execute_and_validate_step(self, agent_type, step_info):
+        """Exécute une étape puis vérifie qu'elle a réellement abouti"""
+        step_id = step_info['id']
+        self.emit('step_started', step_id=step_id)
+        
+        # Du modèle le plus léger adéquat au plus lourd : on n'escalade qu'en cas d'échec
+        models = self.tier_policy.candidates(agent_type, step_info.get('complexity'),
+                                             self.orchestrator.agents[agent_type]['model'])
+        validation = {'success': False, 'feedback': "Étape interrompue"}
+        for i, model in enumerate(models):
+            if self.stop_requested:
+                break
+            if i > 0:
+                print(f"⬆️  Escalade de l'étape {step_id} vers {model}")
             
-            # Ignorer les non-commandes
-            if not cmd or cmd.startswith('#') or cmd.startswith('//') or len(cmd) < 3:
-                continue
-                
-            # Nettoyer les artefacts
-            cmd = re.sub(r'^[\*\-\+]?\s*', '', cmd)  # Enlever les listes
-            cmd = re.sub(r'```[a-z]*\s*$', '', cmd)  # Enlever les fin de code block
+            start = time.monotonic()
+            outcome = self.execute_agent_task(agent_type, step_info['description'], model=model)
+            latency = time.monotonic() - start
+            if self.stop_requested:
+                break
+            
+            print(f"\n🔎 Validation de l'étape {step_id}...")
+            self.emit('step_validating', step_id=step_id)
+            # Chaque essai n'est jugé que sur les fichiers et commandes qu'il a lui-même produits
+            validation = self.validator.validate(step_info['description'], outcome)
+            if outcome is not None:
+                self.tier_policy.record(agent_type, model, validation['success'], latency)
+            else:
+                validation['feedback'] = f"API injoignable pour {model}"
             
-            if cmd:
-                print(f"⚡ Exécution: {cmd}")
-                result = self.terminal.execute_command(cmd, timeout=60)
-                print(f"🔄 {'✅ Succès' if result['success'] else '❌ Erreur'}")
-                if result['stdout']:
-                    print(f"📤 {result['stdout'][:200]}{'...' if len(result['stdout']) > 200 else ''}")
-                if result['stderr']:
-                    print(f"⚠️  {result['stderr'][:200]}{'...' if len(result['stderr']) > 200 else ''}")
+            if validation['success']:
+                break
+        
+        if self.stop_requested and not validation['success']:
+            # Étape interrompue : ni réussie ni en échec, l'appelant signale l'interruption
+            return False
         
-        return response
+        if validation['success']:
+            print(f"✅ Étape {step_id} validée")
+            self.emit('step_completed', step_id=step_id, validation=validation)
+        else:
+            print(f"❌ Étape {step_id} en échec: {validation['feedback']}")
+            self.emit('step_failed', step_id=step_id, validation=validation)
+        
+        return validation['success']
     
     def execute_with_terminal(self, task):
         """Exécute une tâche complète avec accès terminal actif"""
@@ -211,9 +246,14 @@ COMMANDES :
         
         # Étape 1: Générer le plan orchestré
         print("📊 GÉNÉRATION DU PLAN ORCHESTRÉ...")
+        self.emit('status', message='Génération du plan...')
         plan = self.orchestrator.generate_orchestrated_plan(task)
         print(plan)
         
+        steps = re.findall(r'📍 ÉTAPE (\d+) : (.*)', plan)
+        self.emit('plan_created', plan=[{'id': num, 'objective': title.strip(), 'status': 'pending'}
+                                        for num, title in steps])
+        
         # Étape 2: Extraire et exécuter les commandes du plan
         execution_log = self.extract_and_execute_commands(plan)
         
@@ -229,11 +269,20 @@ COMMANDES :
             line = line.strip()
             
             if line.startswith('📍 ÉTAPE'):
+                if self.stop_requested:
+                    print("\n⏹️  Arrêt demandé : étapes restantes ignorées")
+                    self.emit('execution_interrupted', message="Arrêt demandé par l'utilisateur")
+                    break
+                
                 # Sauvegarder l'info de l'étape
-                current_step_info = {'title': line}
+                step_match = re.match(r'📍 ÉTAPE (\d+)', line)
+                current_step_info = {'title': line, 'id': step_match.group(1) if step_match else line}
                 
             elif line.startswith('📝 Description :'):
                 current_step_info['description'] = line.replace('📝 Description :', '').strip()
+            
+            elif '📊 Complexité :' in line:
+                current_step_info['complexity'] = line.split('📊 Complexité :')[1].strip()
                 
             elif line.startswith('🤖 Agent assigné :'):
                 agent_name = line.replace('🤖 Agent assigné :', '').strip()
@@ -246,8 +295,14 @@ COMMANDES :
                         break
                 
                 if agent_type and current_step_info.get('description'):
-                    # Exécuter la tâche avec l'agent spécialisé
-                    self.execute_agent_task(agent_type, current_step_info['description'])
+                    # Exécuter la tâche avec l'agent spécialisé puis la valider
+                    if not self.execute_and_validate_step(agent_type, current_step_info):
+                        if self.stop_requested:
+                            print("\n⏹️  Arrêt demandé : étape en cours interrompue")
+                            self.emit('execution_interrupted', message="Arrêt demandé par l'utilisateur")
+                        else:
+                            print("\n🛑 Étape en échec : arrêt du plan pour ne pas continuer sur une base cassée")
+                        break
         
         # Étape 4: Afficher le workspace final
         print("\n📁 CONTENU DU WORKSPACE FINAL:")
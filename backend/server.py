@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+import sys
+import os
+
+# Ajoute les répertoires au path Python
+sys.path.append(os.path.dirname(__file__))
+
+import asyncio
+import json
+import re
+import shutil
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from run import ContainerAgent, MAX_EVENT_OUTPUT
+from tools.terminal import TerminalTool
+
+PROJECTS_DIR = os.environ.get("AGENT_PROJECTS_DIR", "/workspace/projects")
+
+# Format des identifiants générés par create_project
+PROJECT_ID_PATTERN = re.compile(r'^[0-9a-f]{12}$')
+
+# Admission : nombre d'agents en parallèle et de tâches en attente au-delà
+MAX_WORKERS = int(os.environ.get("AGENT_MAX_WORKERS", "2"))
+MAX_QUEUED_TASKS = int(os.environ.get("AGENT_MAX_QUEUED_TASKS", "8"))
+
+# Tampon d'envoi par connexion : au-delà, un client trop lent est déconnecté
+MAX_PENDING_EVENTS = 500
+MAX_COALESCED_OUTPUT = MAX_EVENT_OUTPUT
+
+# Événements à haut débit fusionnables avec le précédent du même type
+COALESCABLE_EVENTS = {'tool_result', 'token', 'status'}
+
+# Délai laissé aux agents en cours lors de l'arrêt du serveur. Un agent s'arrête avant
+# chaque étape, escalade et commande ; il peut encore terminer l'appel bloquant en cours :
+# une commande (60 s max) ou un appel modèle (timeout de 60 s entre deux paquets).
+# Les threads n'étant pas interruptibles, au-delà de ce délai le processus attend
+# encore la fin de cet appel avant de quitter.
+SHUTDOWN_TIMEOUT = 90
+
+# Un seul fil d'écriture par projet pour l'historique de chat
+CHAT_LOCKS = {}
+CHAT_LOCKS_GUARD = threading.Lock()
+
+
+class ProjectCreate(BaseModel):
+    name: str
+    description: str = ""
+
+
+class FileWrite(BaseModel):
+    path: str
+    content: str
+
+
+class ConnectionSender:
+    """Tampon d'envoi borné d'un WebSocket : l'agent n'attend jamais le navigateur"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.task = asyncio.create_task(self.drain())
+
+    def is_event(self, message, event_type, tool=None):
+        return (isinstance(message, dict) and message.get('type') == event_type
+                and (tool is None or message.get('tool') == tool))
+
+    def coalesce(self, event):
+        """Fusionne l'événement avec le dernier en attente s'il est du même flux"""
+        if event.get('type') not in COALESCABLE_EVENTS or not self.pending:
+            return False
+        last = self.pending[-1]
+
+        if event['type'] == 'tool_result':
+            return self.coalesce_tool_result(event)
+        if not self.is_event(last, event['type']) or last.get('step_id') != event.get('step_id'):
+            return False
+
+        if event['type'] == 'status':
+            last['message'] = event.get('message')
+        else:
+            last['content'] = (last.get('content') or '') + (event.get('content') or '')
+        return True
+
+    def coalesce_tool_result(self, event):
+        """Replie [appel, résultat, appel] + résultat en un seul couple appel/résultat
+
+        Le frontend rattache chaque résultat au dernier appel : on fusionne donc les
+        commandes des deux appels et les sorties des deux résultats."""
+        tool = event.get('tool')
+        if self.is_event(self.pending[-1], 'tool_result', tool):
+            # Sortie envoyée en plusieurs morceaux pour le même appel
+            prev_result = self.pending[-1]
+        elif len(self.pending) >= 3 and self.is_event(self.pending[-3], 'tool_call', tool) \
+                and self.is_event(self.pending[-2], 'tool_result', tool) \
+                and self.is_event(self.pending[-1], 'tool_call', tool):
+            prev_call, prev_result, call = self.pending[-3], self.pending[-2], self.pending.pop()
+            prev_args = prev_call.setdefault('arguments', {})
+            args = call.get('arguments') or {}
+            if 'command' in prev_args or 'command' in args:
+                prev_args['command'] = '\n'.join(c for c in (prev_args.get('command'), args.get('command')) if c)
+        else:
+            return False
+
+        output = (prev_result.get('output') or '') + (event.get('output') or '')
+        prev_result['output'] = output[-MAX_COALESCED_OUTPUT:]
+        prev_result['success'] = prev_result.get('success', True) and event.get('success', True)
+        return True
+
+    def make_room(self):
+        """Libère une place : d'abord status/token, puis un couple appel/résultat complet"""
+        for i, message in enumerate(self.pending):
+            if isinstance(message, dict) and message.get('type') in ('status', 'token'):
+                del self.pending[i]
+                return True
+        for i, call in enumerate(self.pending):
+            if not self.is_event(call, 'tool_call'):
+                continue
+            # Le prochain événement du même outil doit être le résultat de cet appel
+            for j in range(i + 1, len(self.pending)):
+                message = self.pending[j]
+                if self.is_event(message, 'tool_call', call.get('tool')):
+                    break
+                if self.is_event(message, 'tool_result', call.get('tool')):
+                    del self.pending[j]
+                    del self.pending[i]
+                    return True
+        return False
+
+    def push(self, message):
+        """Ajoute un événement (dict) ou un texte brut à envoyer, sans jamais bloquer"""
+        if self.closed:
+            return
+        # Borner aussi la taille de chaque événement, pas seulement leur nombre
+        if isinstance(message, dict) and len(message.get('output') or '') > MAX_COALESCED_OUTPUT:
+            message['output'] = message['output'][-MAX_COALESCED_OUTPUT:]
+        if isinstance(message, dict) and self.coalesce(message):
+            return
+
+        # Sacrifier d'abord les événements de progression, jamais les étapes ou résultats
+        if len(self.pending) >= MAX_PENDING_EVENTS and not self.make_room():
+            print("🐢 Client trop lent : connexion fermée")
+            self.abort()
+            return
+
+        self.pending.append(message)
+        self.ready.set()
+
+    async def drain(self):
+        """Envoie les événements en attente au rythme du client"""
+        try:
+            while not self.closed or self.pending:
+                if not self.pending:
+                    self.ready.clear()
+                    await self.ready.wait()
+                    continue
+                message = self.pending.popleft()
+                if isinstance(message, dict):
+                    message = json.dumps(message, ensure_ascii=False)
+                await self.websocket.send_text(message)
+        except Exception:
+            self.closed = True
+            self.pending.clear()
+
+    def close(self):
+        """Arrête les envois : le reste du tampon est abandonné"""
+        self.closed = True
+        self.pending.clear()
+        self.ready.set()
+
+    def abort(self):
+        """Ferme vraiment le WebSocket pour que le navigateur voie la coupure et se reconnecte"""
+        self.close()
+        asyncio.create_task(self.close_socket())
+
+    async def close_socket(self):
+        try:
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def flush(self, timeout=5):
+        """Laisse le temps d'envoyer le tampon puis s'arrête (arrêt propre)"""
+        self.closed = True
+        self.ready.set()
+        try:
+            await asyncio.wait_for(self.task, timeout)
+        except asyncio.TimeoutError:
+            self.task.cancel()
+
+
+class TaskManager:
+    """File de tâches bornée : les agents tournent dans des threads, hors de la boucle asyncio
+
+    Au plus une tâche par projet à la fois : les suivantes attendent dans la file du projet."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="agent")
+        self.workers = []
+        self.running_agents = set()
+        self.busy_projects = set()
+        self.waiting = {}
+        self.pending_count = 0
+        self.accepting = True
+
+    def start(self):
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(MAX_WORKERS)]
+
+    def submit(self, job):
+        """Admet une tâche si la file n'est pas pleine, sinon la refuse immédiatement"""
+        if not self.accepting or self.pending_count >= MAX_QUEUED_TASKS:
+            return False
+        self.pending_count += 1
+        project_id = job['project_id']
+        if project_id in self.busy_projects:
+            self.waiting.setdefault(project_id, deque()).append(job)
+        else:
+            self.busy_projects.add(project_id)
+            self.queue.put_nowait(job)
+        return True
+
+    def release(self, project_id):
+        """Passe à la tâche suivante du projet, ou libère le projet"""
+        waiting = self.waiting.get(project_id)
+        if waiting:
+            self.queue.put_nowait(waiting.popleft())
+            if not waiting:
+                del self.waiting[project_id]
+        else:
+            self.busy_projects.discard(project_id)
+
+    async def worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            self.pending_count -= 1
+            try:
+                if job['agent'].stop_requested:
+                    continue
+                self.running_agents.add(job['agent'])
+                await loop.run_in_executor(self.executor, job['run'])
+            except Exception as e:
+                job['sender'].push({'type': 'error', 'content': f"Erreur de l'agent: {e}"})
+            finally:
+                self.running_agents.discard(job['agent'])
+                self.release(job['project_id'])
+                self.queue.task_done()
+
+    async def shutdown(self):
+        """Refuse les nouvelles tâches, interrompt les plans en cours et attend les agents"""
+        self.accepting = False
+        rejected = [job for waiting in self.waiting.values() for job in waiting]
+        self.waiting.clear()
+        while not self.queue.empty():
+            rejected.append(self.queue.get_nowait())
+            self.queue.task_done()
+        for job in rejected:
+            self.pending_count -= 1
+            job['sender'].push({'type': 'error', 'content': "Serveur en cours d'arrêt"})
+        for agent in list(self.running_agents):
+            agent.request_stop()
+        try:
+            await asyncio.wait_for(self.queue.join(), SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            print("⚠️  Des agents tournent encore : le processus attendra la fin de leur appel en cours")
+        for worker in self.workers:
+            worker.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def project_dir(project_id):
+    """Dossier d'un projet existant ; refuse tout identifiant hors format (., .., chemins)"""
+    if not PROJECT_ID_PATTERN.match(project_id or ''):
+        raise HTTPException(status_code=404, detail="Projet introuvable")
+    path = os.path.join(PROJECTS_DIR, project_id)
+    if os.path.realpath(os.path.dirname(path)) != os.path.realpath(PROJECTS_DIR) or not os.path.isdir(path):
+        raise HTTPException(status_code=404, detail="Projet introuvable")
+    return path
+
+
+def read_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return default
+
+
+def write_json(path, data):
+    TerminalTool(os.path.dirname(path)).write_files([(os.path.basename(path), json.dumps(data, indent=2, ensure_ascii=False))])
+
+
+def append_chat(project_id, role, content):
+    with CHAT_LOCKS_GUARD:
+        lock = CHAT_LOCKS.setdefault(project_id, threading.Lock())
+    with lock:
+        path = os.path.join(project_dir(project_id), '.chat.json')
+        messages = read_json(path, [])
+        messages.append({'role': role, 'content': content, 'timestamp': datetime.now().isoformat()})
+        write_json(path, messages)
+
+
+def safe_file_path(project_id, filepath):
+    """Chemin absolu d'un fichier du projet, refusé s'il sort du projet"""
+    root = os.path.realpath(project_dir(project_id))
+    full_path = os.path.realpath(os.path.join(root, filepath))
+    if os.path.commonpath([root, full_path]) != root:
+        raise HTTPException(status_code=400, detail="Chemin invalide")
+    return full_path
+
+
+@asynccontextmanager
+async def lifespan(app):
+    os.makedirs(PROJECTS_DIR, exist_ok=True)
+    app.state.tasks = TaskManager()
+    app.state.senders = set()
+    app.state.tasks.start()
+    print(f"🌐 Serveur prêt - projets dans {PROJECTS_DIR}")
+    yield
+    print("⏹️  Arrêt du serveur...")
+    await app.state.tasks.shutdown()
+    await asyncio.gather(*(sender.flush() for sender in list(app.state.senders)))
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+@app.get("/api/projects")
+def list_projects():
+    projects = []
+    for name in os.listdir(PROJECTS_DIR):
+        project = read_json(os.path.join(PROJECTS_DIR, name, '.project.json'), None)
+        if isinstance(project, dict) and PROJECT_ID_PATTERN.match(str(project.get('id', ''))):
+            projects.append(project)
+    projects.sort(key=lambda p: str(p.get('updated_at', '')), reverse=True)
+    return {'projects': projects}
+
+
+@app.post("/api/projects")
+def create_project(body: ProjectCreate):
+    now = datetime.now().isoformat()
+    project = {
+        'id': uuid.uuid4().hex[:12],
+        'name': body.name,
+        'description': body.description,
+        'created_at': now,
+        'updated_at': now,
+        'status': 'active'
+    }
+    path = os.path.join(PROJECTS_DIR, project['id'])
+    os.makedirs(path)
+    write_json(os.path.join(path, '.project.json'), project)
+    return {'project': project}
+
+
+@app.delete("/api/projects/{project_id}")
+def delete_project(project_id: str):
+    shutil.rmtree(project_dir(project_id))
+    return {'success': True}
+
+
+@app.get("/api/projects/{project_id}/files")
+def list_project_files(project_id: str):
+    return {'files': TerminalTool(project_dir(project_id)).file_infos()}
+
+
+@app.get("/api/projects/{project_id}/files/content")
+def read_project_file(project_id: str, path: str, raw: bool = False):
+    full_path = safe_file_path(project_id, path)
+    if not os.path.isfile(full_path):
+        raise HTTPException(status_code=404, detail="Fichier introuvable")
+    if raw:
+        return FileResponse(full_path)
+
+    result = TerminalTool(project_dir(project_id)).read_file(path)
+    if not result['success']:
+        raise HTTPException(status_code=400, detail=result['content'])
+    return {'path': path, 'content': result['content']}
+
+
+@app.post("/api/projects/{project_id}/files")
+def write_project_file(project_id: str, body: FileWrite):
+    safe_file_path(project_id, body.path)
+    result = TerminalTool(project_dir(project_id)).write_files([(body.path, body.content)])
+    if not result['success']:
+        raise HTTPException(status_code=500, detail=result['message'])
+    return {'success': True, 'path': body.path}
+
+
+@app.get("/api/projects/{project_id}/chat/history")
+def chat_history(project_id: str):
+    return {'messages': read_json(os.path.join(project_dir(project_id), '.chat.json'), [])}
+
+
+@app.websocket("/ws/chat/{project_id}")
+async def chat(websocket: WebSocket, project_id: str):
+    await websocket.accept()
+    try:
+        workspace = project_dir(project_id)
+    except HTTPException:
+        await websocket.close(code=4404)
+        return
+
+    loop = asyncio.get_running_loop()
+    tasks = websocket.app.state.tasks
+    sender = ConnectionSender(websocket)
+    websocket.app.state.senders.add(sender)
+    # Tous les agents soumis par cette connexion, en file ou en cours
+    agents = set()
+
+    def submit(task):
+        # Les événements arrivent depuis le thread de l'agent
+        agent = ContainerAgent(event_callback=lambda event: loop.call_soon_threadsafe(sender.push, event),
+                               workspace=workspace)
+
+        def run():
+            try:
+                append_chat(project_id, 'user', task)
+                plan, _ = agent.execute_with_terminal(task)
+                append_chat(project_id, 'agent', plan)
+                loop.call_soon_threadsafe(sender.push, {'type': 'result', 'content': plan})
+            finally:
+                loop.call_soon_threadsafe(agents.discard, agent)
+
+        if not tasks.submit({'agent': agent, 'sender': sender, 'run': run, 'project_id': project_id}):
+            sender.push({'type': 'error', 'content': "Serveur saturé : réessaie dans un instant"})
+            return
+        agents.add(agent)
+        sender.push({'type': 'status', 'message': "Tâche en file d'attente..."})
+
+    def stop():
+        for agent in agents:
+            agent.request_stop()
+        agents.clear()
+        sender.push({'type': 'stop_acknowledged', 'message': "Arrêt après l'étape en cours..."})
+
+    try:
+        while True:
+            message = await websocket.receive_text()
+            if message == 'ping':
+                sender.push('pong')
+            elif message == '__STOP__':
+                stop()
+            elif message.startswith('{') and '"type"' in message:
+                try:
+                    data = json.loads(message)
+                except json.JSONDecodeError:
+                    submit(message)
+                    continue
+                if data.get('type') == 'stop':
+                    stop()
+                    if data.get('message'):
+                        submit(data['message'])
+            elif message.strip():
+                submit(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # L'agent continue : seul le tampon de cette connexion est libéré
+        sender.close()
+        websocket.app.state.senders.discard(sender)
+
+
+def main():
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "8000")))
+
+
+if __name__ == "__main__":
+    main()
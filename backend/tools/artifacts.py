@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import os
+import re
+
+from tools.command_filter import CommandFilter
+
+# Blocs de code délimités : ```info\ncontenu```
+FENCE_PATTERN = re.compile(r'```([^\n`]*)\n(.*?)```', re.DOTALL)
+
+# Un nom de fichier plausible (chemin relatif avec extension)
+PATH_PATTERN = re.compile(r'[\w\-./]*\w\.[A-Za-z0-9]{1,5}')
+
+# Ligne précédant un bloc qui annonce le fichier : "**main.c**", "Fichier : main.c", "### `main.c`"
+HEADER_PATTERN = re.compile(
+    r'^\s*(?:[#>*\-\d.]+\s*)*(?:(?:fichier|file|filename|nom)\s*:?\s*)?[*`"]*([\w\-./]*\w\.[A-Za-z0-9]{1,5})[*`"]*\s*:?\s*$',
+    re.IGNORECASE
+)
+
+# Commentaire d'en-tête contenant uniquement le nom du fichier : "# hello.py", "// main.c"
+COMMENT_HEADER_PATTERN = re.compile(r'^\s*(?:#|//|/\*|<!--|--)\s*([\w\-./]*\w\.[A-Za-z0-9]{1,5})\s*(?:\*/|-->)?\s*$')
+
+# En-tête annonçant la liste de commandes demandée dans le prompt ("COMMANDES :")
+COMMANDS_HEADER_PATTERN = re.compile(r'^\W*(?:commandes?|commands?)\b.*$', re.IGNORECASE)
+
+# Langages dont les blocs sans chemin sont des commandes, pas des fichiers
+SHELL_LANGUAGES = {'bash', 'sh', 'shell', 'console', 'zsh', 'terminal'}
+
+# Nom par défaut quand seul le langage est connu
+DEFAULT_FILENAMES = {
+    'python': 'script.py', 'py': 'script.py',
+    'c': 'program.c', 'cpp': 'program.cpp', 'c++': 'program.cpp',
+    'javascript': 'script.js', 'js': 'script.js', 'jsx': 'App.jsx',
+    'typescript': 'script.ts', 'ts': 'script.ts', 'tsx': 'App.tsx',
+    'html': 'index.html', 'css': 'style.css', 'json': 'data.json',
+    'yaml': 'config.yaml', 'yml': 'config.yaml',
+    'markdown': 'document.md', 'md': 'document.md',
+    'java': 'Main.java', 'go': 'main.go', 'rust': 'main.rs', 'sql': 'query.sql',
+}
+
+
+class ArtifactExtractor:
+    def __init__(self):
+        self.command_filter = CommandFilter(verbose=False)
+
+    def is_command_block(self, response, start, content):
+        """Bloc sans langage : commandes s'il suit "COMMANDES :" ou si chaque ligne ressemble à du shell"""
+        preceding = [l for l in response[:start].split('\n')[-3:] if l.strip()]
+        if preceding and COMMANDS_HEADER_PATTERN.match(preceding[-1]):
+            return True
+        lines = [self.command_filter.clean(l) for l in content.split('\n') if l.strip()]
+        return bool(lines) and all(self.command_filter.classify(l)[0] for l in lines)
+
+    def is_safe_path(self, path):
+        """Refuse les chemins absolus ou qui sortent du workspace"""
+        normalized = os.path.normpath(path)
+        return not os.path.isabs(normalized) and not normalized.startswith('..')
+
+    def parse_info(self, info):
+        """Sépare le langage et un éventuel chemin déclaré (```python:app.py, ```python title="app.py")"""
+        info = info.strip()
+        if not info:
+            return '', None
+
+        title_match = re.search(r'(?:title|file|filename|path)\s*=\s*["\']?([^"\'\s]+)', info)
+        head, _, rest = info.partition(' ')
+        language, _, inline_path = head.partition(':')
+
+        path = title_match.group(1) if title_match else inline_path or None
+        if not path and PATH_PATTERN.fullmatch(language):
+            # ```main.c : le chemin sert aussi de langage
+            language, path = os.path.splitext(language)[1].lstrip('.'), language
+        if not path and rest and PATH_PATTERN.fullmatch(rest.strip()):
+            path = rest.strip()
+        return language.lower(), path
+
+    def declared_path(self, response, start):
+        """Cherche un nom de fichier annoncé sur les lignes non vides précédant un bloc"""
+        preceding = [l for l in response[:start].split('\n')[-3:] if l.strip()]
+        if preceding:
+            match = HEADER_PATTERN.match(preceding[-1])
+            if match:
+                return match.group(1)
+        return None
+
+    def unique_path(self, path, used):
+        """Évite qu'un bloc en écrase un autre dans la même réponse"""
+        candidate = path
+        stem, ext = os.path.splitext(path)
+        counter = 2
+        while candidate in used:
+            candidate = f"{stem}_{counter}{ext}"
+            counter += 1
+        used.add(candidate)
+        return candidate
+
+    def extract(self, response):
+        """Retourne (artefacts, commandes) : un artefact par bloc de code, commandes des blocs shell"""
+        artifacts = []
+        unnamed = []
+        commands = []
+        used = set()
+
+        for match in FENCE_PATTERN.finditer(response or ''):
+            language, path = self.parse_info(match.group(1))
+            content = match.group(2).rstrip('\n')
+            if not content.strip():
+                continue
+
+            path = path or self.declared_path(response, match.start())
+            if not path:
+                comment_match = COMMENT_HEADER_PATTERN.match(content.split('\n')[0])
+                if comment_match and language not in SHELL_LANGUAGES:
+                    path = comment_match.group(1)
+
+            if not path and (language in SHELL_LANGUAGES
+                             or not language and self.is_command_block(response, match.start(), content)):
+                commands.extend(l for l in content.split('\n') if l.strip())
+                continue
+
+            if not path and language not in DEFAULT_FILENAMES:
+                # Sans nom ni langage : souvent un exemple de sortie, gardé seulement s'il est seul
+                unnamed.append({'language': language, 'content': content})
+                continue
+
+            path = path or DEFAULT_FILENAMES[language]
+            if not self.is_safe_path(path):
+                print(f"🚫 Chemin refusé: {path}")
+                continue
+
+            artifacts.append({
+                'path': self.unique_path(os.path.normpath(path), used),
+                'language': language,
+                'content': content
+            })
+
+        if not artifacts:
+            for block in unnamed:
+                artifacts.append({'path': self.unique_path('generated_content.txt', used), **block})
+        else:
+            for block in unnamed:
+                first_line = block['content'].split('\n')[0]
+                print(f"🚫 Bloc sans nom ignoré: {first_line[:80]}")
+
+        return artifacts, commands
+
+    def strip_fences(self, response):
+        """Retire les blocs de code pour ne chercher les commandes inline que dans le texte"""
+        return FENCE_PATTERN.sub('', response or '')
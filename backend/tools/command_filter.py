@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import re
+import shlex
+import shutil
+
+# Builtins du shell : jamais trouvés par shutil.which mais toujours valides
+SHELL_BUILTINS = {
+    'cd', 'echo', 'export', 'source', '.', 'set', 'unset', 'alias', 'exit',
+    'printf', 'read', 'test', '[', 'true', 'false', 'pwd', 'eval', 'exec',
+    'type', 'ulimit', 'umask', 'wait', 'for', 'while', 'if', 'case'
+}
+
+# Index des binaires connus : peuvent ne pas être installés au moment du filtrage
+# (ex: "apt-get install pandoc" exécuté juste avant "pandoc ...")
+KNOWN_BINARIES = {
+    'apt', 'apt-get', 'dpkg', 'pip', 'pip3', 'npm', 'npx', 'yarn', 'node',
+    'python', 'python3', 'gcc', 'g++', 'cc', 'clang', 'make', 'cmake',
+    'javac', 'java', 'go', 'cargo', 'rustc', 'git', 'curl', 'wget', 'jq',
+    'pandoc', 'pdflatex', 'xelatex', 'ls', 'cat', 'head', 'tail', 'mkdir',
+    'rm', 'cp', 'mv', 'touch', 'chmod', 'chown', 'grep', 'sed', 'awk', 'find',
+    'tar', 'unzip', 'zip', 'bash', 'sh', 'sudo', 'env', 'which', 'wc',
+    'sort', 'uniq', 'diff', 'tee', 'xargs', 'ln', 'pytest', 'tree', 'file'
+}
+
+# Seules commandes acceptées sans argument : les autres (cat, sh, python3, pandoc...)
+# viennent souvent d'un mot cité dans le texte et attendraient stdin jusqu'au timeout
+STANDALONE_COMMANDS = {'ls', 'pwd', 'cd', 'make', 'tree', 'true', 'false', 'env', 'exit'}
+
+# Préfixes qui ne désignent pas la commande réelle
+COMMAND_PREFIXES = {'sudo', 'env', 'time', 'nohup'}
+
+ENV_ASSIGNMENT = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*=')
+
+
+class CommandFilter:
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.rejected = []
+
+    def clean(self, command):
+        """Nettoie une commande candidate (puces de liste, fins de bloc de code, espaces)"""
+        command = command.strip()
+        command = re.sub(r'^[\*\-\+]\s+', '', command)  # Enlever les listes
+        command = re.sub(r'^\$\s+', '', command)  # Enlever les invites "$ "
+        command = re.sub(r'```[a-z]*\s*$', '', command)  # Enlever les fin de code block
+        return ' '.join(command.split())
+
+    def classify(self, command):
+        """Retourne (True, None) si la commande ressemble à du shell, sinon (False, raison)"""
+        if not command:
+            return False, "vide"
+        if command.startswith(('#', '//')):
+            return False, "commentaire"
+
+        try:
+            tokens = shlex.split(command, comments=True)
+        except ValueError as e:
+            return False, f"syntaxe shell invalide ({e})"
+
+        # Ignorer les affectations de variables et les préfixes (sudo, env...)
+        tokens = [t for t in tokens if not ENV_ASSIGNMENT.match(t)] or tokens
+        while len(tokens) > 1 and tokens[0] in COMMAND_PREFIXES:
+            tokens = tokens[1:]
+        if not tokens:
+            return False, "vide"
+
+        first = tokens[0]
+        if len(tokens) == 1 and first not in STANDALONE_COMMANDS and not first.startswith(('./', '/', '~/')):
+            return False, f"commande sans argument ({first})"
+        if first in SHELL_BUILTINS or first in KNOWN_BINARIES:
+            return True, None
+        # Scripts locaux ou chemins absolus (./build.sh, /usr/bin/foo)
+        if first.startswith(('./', '/', '~/')):
+            return True, None
+        # Les fragments très courts ne sont acceptés que s'ils sont connus (ls, cd...)
+        if len(command) < 3:
+            return False, "trop courte"
+        if re.search(r'[(){}<>;"\']', first):
+            return False, f"ressemble à du code ({first})"
+        if shutil.which(first):
+            return True, None
+        return False, f"binaire inconnu ({first})"
+
+    def filter(self, candidates):
+        """Nettoie, dédoublonne et filtre les commandes candidates en conservant l'ordre"""
+        accepted = []
+        seen = set()
+
+        for candidate in candidates:
+            command = self.clean(candidate)
+            if command in seen:
+                continue
+            seen.add(command)
+
+            is_shell, reason = self.classify(command)
+            if is_shell:
+                accepted.append(command)
+            else:
+                self.rejected.append({'command': command, 'reason': reason})
+                if self.verbose and command:
+                    print(f"🚫 Ignorée: {command[:80]} ({reason})")
+
+        return accepted
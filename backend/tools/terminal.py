@@ -2,11 +2,13 @@
 import subprocess
 import os
 import sys
+import tempfile
+from datetime import datetime
 from pathlib import Path
 
 class TerminalTool:
-    def __init__(self):
-        self.workspace = "/workspace"
+    def __init__(self, workspace="/workspace"):
+        self.workspace = workspace
         self.ensure_workspace()
     
     def ensure_workspace(self):
@@ -29,6 +31,7 @@ class TerminalTool:
                 command,
                 shell=True,
                 cwd=self.workspace,
+                stdin=subprocess.DEVNULL,  # Une commande qui lit stdin échoue au lieu d'attendre le timeout
                 capture_output=True,
                 text=True,
                 timeout=timeout
@@ -110,4 +113,78 @@ class TerminalTool:
             return {
                 "success": False,
                 "message": f"Erreur: {str(e)}"
-            }
\ No newline at end of file
+            }
+    
+    def write_files(self, files):
+        """Écrit plusieurs fichiers en une seule transaction : tous ou aucun"""
+        staged = []
+        committed = []
+        try:
+            # Préparer chaque fichier dans un temporaire à côté de sa destination
+            for filepath, content in files:
+                full_path = os.path.join(self.workspace, filepath)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), prefix='.tmp-')
+                staged.append((tmp_path, full_path))
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                # mkstemp crée en 0600 : garder les droits du fichier remplacé s'il existe
+                mode = os.stat(full_path).st_mode & 0o777 if os.path.exists(full_path) else 0o644
+                os.chmod(tmp_path, mode)
+            
+            # Tout est prêt : remplacer chaque destination en gardant l'ancienne version de côté
+            for tmp_path, full_path in staged:
+                backup_path = None
+                if os.path.isfile(full_path):
+                    backup_path = tmp_path + '.bak'
+                    os.replace(full_path, backup_path)
+                committed.append((full_path, backup_path))
+                os.replace(tmp_path, full_path)
+            
+            for _, backup_path in committed:
+                if backup_path:
+                    os.remove(backup_path)
+            
+            return {
+                "success": True,
+                "message": f"{len(staged)} fichier(s) écrit(s)",
+                "files": [filepath for filepath, _ in files]
+            }
+        except Exception as e:
+            # Restaurer les destinations déjà remplacées, puis jeter les temporaires
+            for full_path, backup_path in reversed(committed):
+                try:
+                    if backup_path:
+                        os.replace(backup_path, full_path)
+                    elif os.path.isfile(full_path):
+                        os.remove(full_path)
+                except OSError:
+                    pass
+            for tmp_path, _ in staged:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            return {
+                "success": False,
+                "message": f"Erreur: {str(e)}",
+                "files": []
+            }
+    
+    def file_infos(self):
+        """Liste récursive du workspace au format attendu par le frontend"""
+        infos = []
+        for root, dirs, filenames in os.walk(self.workspace):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d != '__pycache__')
+            for name in dirs + sorted(f for f in filenames if not f.startswith('.')):
+                full_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                infos.append({
+                    "name": name,
+                    "path": os.path.relpath(full_path, self.workspace),
+                    "is_dir": os.path.isdir(full_path),
+                    "size": stat.st_size,
+                    "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
+                })
+        return infos
\ No newline at end of file
@@ -334,7 +334,7 @@ function App() {
         setLastActivity(null)
         fetchFiles()
       } else if (data.type === 'files_updated') {
-        setFiles(data.files)
+        fetchFiles()
       } else if (data.type === 'error') {
         setMessages(prev => [...prev, {
           role: 'agent',